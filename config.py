@@ -18,6 +18,7 @@ GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_M
 # Worker settings
 CHUNK_SECONDS = int(os.getenv("CHUNK_SECONDS", "600"))
 MAX_SUBTASKS = int(os.getenv("MAX_SUBTASKS", "20"))
+BREAKDOWN_WORKERS = int(os.getenv("BREAKDOWN_WORKERS", "4"))
 
 # Mongo field keys (your schema: camelCase)
 KEY_ID = "_id"
@@ -28,7 +28,10 @@ def finalize_task(task_id: str) -> Dict[str, Any]:
     tcol = tasks_col()
     pcol = profiles_col()
 
-    doc = tcol.find_one({"_id": ObjectId(task_id)})
+    doc = tcol.find_one(
+        {"_id": ObjectId(task_id)},
+        {KEY_USER_ID: 1, KEY_EXPECTED: 1, KEY_ACTUAL: 1, KEY_TASK_TYPE: 1},
+    )
     if not doc:
         raise ValueError("Task not found")
 
@@ -54,7 +57,7 @@ def finalize_task(task_id: str) -> Dict[str, Any]:
 
     profile = ensure_profile_doc(user_id)
     profile = update_pace_multiplier(profile, task_type, ratio=ratio, lr=0.15)
-    pcol.update_one({"_id": user_id}, {"$set": profile}, upsert=True)
+    pcol.update_one({"_id": user_id}, {"$set": {"paceByType": profile["paceByType"]}}, upsert=True)
 
     tcol.update_one(
         {"_id": doc["_id"]},
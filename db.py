@@ -1,10 +1,11 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, IndexModel
 from pymongo.collection import Collection
 
 from config import (
     MONGODB_URI, DB_NAME,
     TASKS_COLLECTION, SESSIONS_COLLECTION,
-    PROFILE_COLLECTION
+    PROFILE_COLLECTION,
+    KEY_USER_ID, KEY_NEEDS_BREAKDOWN, KEY_ARCHIVED, KEY_DONE, KEY_CREATED
 )
 
 _client_singleton = None
@@ -14,17 +15,41 @@ def get_client() -> MongoClient:
     if _client_singleton is None:
         if not MONGODB_URI:
             raise RuntimeError("Missing MONGODB_URI in .env")
-        _client_singleton = MongoClient(MONGODB_URI)
+        # fail fast instead of hanging on the 30s driver default; retries stay on
+        _client_singleton = MongoClient(
+            MONGODB_URI,
+            serverSelectionTimeoutMS=5000,
+            connectTimeoutMS=5000,
+            socketTimeoutMS=20000,
+            retryWrites=True,
+            retryReads=True,
+        )
     return _client_singleton
 
+_collections = {}
+
+def _col(name: str) -> Collection:
+    # Collection handles are cheap but not free; build each one once.
+    col = _collections.get(name)
+    if col is None:
+        col = _collections[name] = get_client()[DB_NAME][name]
+    return col
+
 def tasks_col() -> Collection:
-    c = get_client()
-    return c[DB_NAME][TASKS_COLLECTION]
+    return _col(TASKS_COLLECTION)
 
 def sessions_col() -> Collection:
-    c = get_client()
-    return c[DB_NAME][SESSIONS_COLLECTION]
+    return _col(SESSIONS_COLLECTION)
 
 def profiles_col() -> Collection:
-    c = get_client()
-    return c[DB_NAME][PROFILE_COLLECTION]
\ No newline at end of file
+    return _col(PROFILE_COLLECTION)
+
+def ensure_indexes() -> None:
+    # Backs run_breakdown_for_user: equality on user/flags, oldest first.
+    # create_indexes is idempotent, so this is safe on every start.
+    tasks_col().create_indexes([
+        IndexModel(
+            [(KEY_USER_ID, 1), (KEY_NEEDS_BREAKDOWN, 1), (KEY_ARCHIVED, 1), (KEY_DONE, 1), (KEY_CREATED, 1)],
+            name="user_breakdown_queue",
+        ),
+    ])
\ No newline at end of file
@@ -1,5 +1,7 @@
+from db import ensure_indexes
 from workers_breakdown import run_breakdown_for_all_users
 
 if __name__ == "__main__":
+    ensure_indexes()
     results = run_breakdown_for_all_users(limit_per_user=10)
     print("Breakdown results per user:", results)
\ No newline at end of file
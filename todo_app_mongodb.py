@@ -1,30 +1,182 @@
+import atexit
 import http.server
-import socketserver
-import json
+import logging
+import logging.handlers
+import gzip
+import math
 import os
+import queue
+import re
 import webbrowser
 import threading
+import time
 import hashlib
 import secrets
-from pymongo import MongoClient
+import orjson
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import OperationFailure
 from bson import ObjectId
+from collections import OrderedDict
 from datetime import datetime
-from http.cookies import SimpleCookie
+
+logger = logging.getLogger(__name__)
 
 PORT = int(os.environ.get('PORT', 8000))
 
 # Session storage
-sessions = {}  # {session_token: user_id}
+SESSION_TTL = 2592000  # seconds; matches the session cookie's Max-Age
+sessions = {}  # {session_token: (user_id, expires_at)}
 
 # MongoDB Atlas connection
 MONGODB_URI = os.environ.get('MONGODB_URI', 'mongodb://localhost:27017/')
 DB_NAME = 'todo_app'
 
+# Connection pool sizing: each request thread holds at most one connection at a time
+MONGO_POOL_MAX = int(os.environ.get('MONGO_POOL_MAX', 50))
+MONGO_POOL_MIN = int(os.environ.get('MONGO_POOL_MIN', 5))
+MONGO_POOL_WAIT_MS = int(os.environ.get('MONGO_POOL_WAIT_MS', 2000))
+MONGO_POOL_IDLE_MS = int(os.environ.get('MONGO_POOL_IDLE_MS', 60000))
+# Wire compression; zlib needs nothing extra, zstd/snappy need their packages installed
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zlib')
+
+def drop_index_if_present(collection, name):
+    try:
+        collection.drop_index(name)
+    except OperationFailure as e:
+        if e.code not in (26, 27):  # NamespaceNotFound, IndexNotFound: nothing to drop
+            logger.exception("Dropping index %s.%s failed", collection.name, name)
+    except Exception:
+        logger.exception("Dropping index %s.%s failed", collection.name, name)
+
+def create_index_logged(collection, keys, **kwargs):
+    try:
+        collection.create_index(keys, **kwargs)
+    except Exception:
+        logger.exception("Creating index %s %s failed", collection.name, kwargs.get('name', keys))
+
+def ensure_indexes():
+    # Runs on a background thread so the server can start listening right away;
+    # create_index is a no-op for indexes that already exist. Each index is built
+    # on its own, so one failure (say duplicates under a unique index) is logged
+    # without skipping the others
+    
+    # Single-field indexes from earlier versions: the list query is served by
+    # active_tasks below, the breakdown worker by the index db.ensure_indexes builds
+    for name in ('archived_1', 'needs_breakdown_1', 'userId_1'):
+        drop_index_if_present(tasks_collection, name)
+    # Serves GET /api/tasks: only active tasks are ever listed, so index just those
+    create_index_logged(
+        tasks_collection,
+        [('userId', 1), ('_id', 1)],
+        partialFilterExpression={'archived': False},
+        name='active_tasks'
+    )
+    # Sessions are stored under sessionId; the old index on the never-set session_id
+    # field let only one document through
+    drop_index_if_present(sessions_collection, 'session_id_1')
+    # Client session ids are timestamps, so they are only unique per user
+    create_index_logged(sessions_collection, [('userId', 1), ('sessionId', 1)], unique=True)
+    create_index_logged(users_collection, 'username', unique=True)
+    create_index_logged(credit_transfers_collection, 'userId')
+
+# Credit transfers are recorded off the request path: the handler validates and queues,
+# this worker does the (eventually on-chain) slow part
+credit_queue = queue.Queue()
+# Records queued but not yet written, so shutdown can wait for them
+credits_pending = 0
+credits_pending_cond = threading.Condition()
+
+def queue_credit_transfer(record):
+    global credits_pending
+    with credits_pending_cond:
+        credits_pending += 1
+    credit_queue.put(record)
+
+def credit_worker():
+    global credits_pending
+    while True:
+        record = credit_queue.get()
+        try:
+            credit_transfers_collection.insert_one(record)
+            logger.info("Credit transfer: %s credits -> %s", record['credits'], record['walletAddress'])
+        except Exception:
+            logger.exception("Error recording credit transfer")
+        finally:
+            with credits_pending_cond:
+                credits_pending -= 1
+                credits_pending_cond.notify_all()
+
+# Bounded, so a stuck insert can't hang shutdown
+CREDIT_DRAIN_TIMEOUT = 5  # seconds
+
+def drain_credit_queue():
+    with credits_pending_cond:
+        if not credits_pending_cond.wait_for(lambda: credits_pending == 0, CREDIT_DRAIN_TIMEOUT):
+            logger.warning("%d credit transfers not recorded", credits_pending)
+
+threading.Thread(target=credit_worker, name='credit-worker', daemon=True).start()
+
+# Finished sessions are buffered for a moment and written together in one bulk_write
+SESSION_FLUSH_DELAY = 0.25  # seconds
+SESSION_FLUSH_SIZE = 50
+session_writes = {}  # {(user_id, session_id): fields}, so a resent session keeps only its last body
+session_writes_lock = threading.Lock()
+session_flush_timer = None
+
+def buffer_session_write(user_id, session_id, fields):
+    global session_flush_timer
+    with session_writes_lock:
+        session_writes[(user_id, session_id)] = fields
+        full = len(session_writes) >= SESSION_FLUSH_SIZE
+        if not full and session_flush_timer is None:
+            session_flush_timer = threading.Timer(SESSION_FLUSH_DELAY, flush_session_writes)
+            session_flush_timer.daemon = True
+            session_flush_timer.start()
+    if full:
+        flush_session_writes()
+
+def flush_session_writes():
+    global session_flush_timer
+    with session_writes_lock:
+        batch = [
+            # Upsert so a retried POST for the same session overwrites instead of failing
+            UpdateOne({'userId': user_id, 'sessionId': session_id}, {'$set': fields}, upsert=True)
+            for (user_id, session_id), fields in session_writes.items()
+        ]
+        session_writes.clear()
+        if session_flush_timer is not None:
+            session_flush_timer.cancel()
+            session_flush_timer = None
+    if not batch:
+        return
+    try:
+        # At most one op per session, so order doesn't matter and one rejected op can't
+        # block the rest; clean_session keeps values BSON can encode, since an encode
+        # error would still fail the whole batch
+        sessions_collection.bulk_write(batch, ordered=False)
+    except Exception:
+        logger.exception("Error saving sessions")
+
 print(f"🔍 Attempting to connect to MongoDB...")
 
+mongo_connected = False
 try:
-    client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
+    client = MongoClient(
+        MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=5000,
+        socketTimeoutMS=20000,
+        retryWrites=True,
+        retryReads=True,
+        maxPoolSize=MONGO_POOL_MAX,
+        minPoolSize=MONGO_POOL_MIN,
+        waitQueueTimeoutMS=MONGO_POOL_WAIT_MS,
+        maxIdleTimeMS=MONGO_POOL_IDLE_MS,
+        compressors=MONGO_COMPRESSORS,
+        zlibCompressionLevel=1,
+    )
     client.admin.command('ping')
+    mongo_connected = True
     
     db = client[DB_NAME]
     tasks_collection = db['tasks']
@@ -32,14 +184,7 @@ try:
     users_collection = db['users']
     credit_transfers_collection = db['credit_transfers']
     
-    # Create indexes
-    tasks_collection.create_index('archived')
-    tasks_collection.create_index('needs_breakdown')
-    tasks_collection.create_index('userId')
-    sessions_collection.create_index('session_id', unique=True)
-    sessions_collection.create_index('userId')
-    users_collection.create_index('username', unique=True)
-    credit_transfers_collection.create_index('userId')
+    threading.Thread(target=ensure_indexes, name='ensure-indexes', daemon=True).start()
     
     print("✅ Connected to MongoDB Atlas")
     print(f"📊 Database: {DB_NAME}")
@@ -47,25 +192,201 @@ except Exception as e:
     print(f"❌ MongoDB connection failed: {e}")
 
 # Authentication helpers
+# scrypt from the stdlib: memory-hard, so a leaked hash can't be brute-forced on GPUs
+# the way a salted sha256 can. ~16 MB and a few tens of ms per hash.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+
 def hash_password(password):
     salt = secrets.token_hex(16)
-    pwd_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}${pwd_hash}"
+    pwd_hash = hashlib.scrypt(password.encode(), salt=salt.encode(), n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P).hex()
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${pwd_hash}"
 
 def verify_password(password, hashed):
     try:
-        salt, pwd_hash = hashed.split('$')
-        return hashlib.sha256((password + salt).encode()).hexdigest() == pwd_hash
-    except:
+        if hashed.startswith('scrypt$'):
+            _, n, r, p, salt, pwd_hash = hashed.split('$')
+            candidate = hashlib.scrypt(password.encode(), salt=salt.encode(), n=int(n), r=int(r), p=int(p)).hex()
+        else:
+            # Legacy "salt$sha256" hashes; rehashed on the next successful login
+            salt, pwd_hash = hashed.split('$')
+            candidate = hashlib.sha256((password + salt).encode()).hexdigest()
+        return secrets.compare_digest(candidate, pwd_hash)
+    except (ValueError, AttributeError):
         return False
 
+def password_needs_rehash(hashed):
+    return not hashed.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+
 def create_session(user_id):
     token = secrets.token_urlsafe(32)
-    sessions[token] = str(user_id)
+    now = time.time()
+    sessions[token] = (str(user_id), now + SESSION_TTL)
+    sweep_sessions(now)
     return token
 
+# Expired logins are normally dropped when looked up; tokens that are never used
+# again are swept at most once an hour so the dict stays bounded
+SESSION_SWEEP_INTERVAL = 3600  # seconds
+sessions_lock = threading.Lock()
+next_session_sweep = 0
+
+def sweep_sessions(now):
+    global next_session_sweep
+    with sessions_lock:
+        if now < next_session_sweep:
+            return
+        next_session_sweep = now + SESSION_SWEEP_INTERVAL
+        expired = [token for token, (_, expires_at) in list(sessions.items()) if expires_at < now]
+    for token in expired:
+        sessions.pop(token, None)
+
+SESSION_COOKIE_RE = re.compile(r'(?:^|;\s*)session_token=([^;]+)')
+
 def get_user_from_session(session_token):
-    return sessions.get(session_token)
+    entry = sessions.get(session_token)
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at < time.time():
+        sessions.pop(session_token, None)
+        return None
+    return user_id
+
+# Largest request body accepted; task and session payloads are a few KB
+MAX_BODY = 1 << 20
+
+# BSON ints are at most 8 bytes; anything bigger fails the whole write it is part of
+INT64_MAX = (1 << 63) - 1
+
+def clean_count(value):
+    # Non-negative int64: durations, counts, millisecond timestamps
+    try:
+        number = int(value)
+    except OverflowError:
+        raise ValueError(value)
+    if not 0 <= number <= INT64_MAX:
+        raise ValueError(value)
+    return number
+
+def clean_amount(value):
+    # Finite, non-negative and no larger than a count could be: credit amounts
+    try:
+        number = float(value)
+    except OverflowError:
+        raise ValueError(value)
+    if not math.isfinite(number) or not 0 <= number <= INT64_MAX:
+        raise ValueError(value)
+    return number
+
+# Base58 alphabet (no 0/O/I/l), 32-44 chars: same check as the page's SOLANA_ADDRESS_RE
+SOLANA_ADDRESS_RE = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')
+
+# A PATCH may set top-level scalars or a single subtask's done flag, nothing else
+SUBTASK_DONE_PATH = re.compile(r'sections\.\d+\.items\.\d+\.done')
+
+def clean_task_patch(updates):
+    if not isinstance(updates, dict) or not updates:
+        return None
+    cleaned = {}
+    for key, value in updates.items():
+        if key == 'task':
+            cleaned[key] = str(value)
+        elif key in ('expectedTime', 'actualTime'):
+            cleaned[key] = clean_count(value)
+        elif key == 'done' or SUBTASK_DONE_PATH.fullmatch(key):
+            cleaned[key] = bool(value)
+        else:
+            return None
+    return cleaned
+
+# Keys the page sends for a new task; sections and subtasks only ever arrive empty,
+# since they come from the breakdown
+NEW_TASK_KEYS = {'id', 'task', 'done', 'expectedTime', 'actualTime', 'createdAt',
+                 'needsBreakdown', 'sections', 'subtasks'}
+
+def clean_new_task(task):
+    if not isinstance(task, dict) or not task.keys() <= NEW_TASK_KEYS:
+        return None
+    if not isinstance(task.get('task'), str):
+        return None
+    return {
+        'task': task['task'],
+        'done': bool(task.get('done', False)),
+        'expectedTime': clean_count(task.get('expectedTime', 0)),
+        'actualTime': clean_count(task.get('actualTime', 0)),
+        'createdAt': str(task.get('createdAt') or datetime.now().isoformat()),
+        'needsBreakdown': bool(task.get('needsBreakdown', True)),
+        'sections': None,
+        'subtasks': [],
+    }
+
+# Fields a finished session is stored with, and the type each is coerced to
+SESSION_FIELDS = {
+    'startTime': str,
+    'endTime': str,
+    'totalDuration': clean_count,
+    'tasksCompleted': clean_count,
+    'creditsEarned': clean_amount,
+    'timestamp': clean_count,
+}
+
+def clean_session(session_data):
+    if not isinstance(session_data, dict):
+        return None
+    session_id = session_data.get('sessionId')
+    if not isinstance(session_id, str) or not session_id:
+        return None
+    cleaned = {key: cast(session_data[key]) for key, cast in SESSION_FIELDS.items() if key in session_data}
+    cleaned['sessionId'] = session_id
+    return cleaned
+
+# Encoded GET /api/tasks bodies per user, dropped on every write to that user's tasks.
+# The TTL bounds staleness from writers outside this process (the breakdown worker).
+TASKS_CACHE_TTL = 30  # seconds
+# Least recently used users are evicted past this many entries
+TASKS_CACHE_MAX = 1000
+tasks_cache = OrderedDict()  # {user_id: (body, etag, expires_at)}; body is None while loading
+tasks_cache_lock = threading.Lock()
+
+def store_tasks_entry(user_id, entry):
+    # Caller holds tasks_cache_lock
+    tasks_cache[user_id] = entry
+    tasks_cache.move_to_end(user_id)
+    while len(tasks_cache) > TASKS_CACHE_MAX:
+        tasks_cache.popitem(last=False)
+
+def get_cached_tasks(user_id):
+    with tasks_cache_lock:
+        entry = tasks_cache.get(user_id)
+        if entry is None:
+            return None
+        if entry[2] < time.time():
+            del tasks_cache[user_id]
+            return None
+        if entry[0] is None:
+            return None
+        tasks_cache.move_to_end(user_id)
+        return entry[0], entry[1]
+
+def start_tasks_load(user_id):
+    # Placeholder for the body about to be built; a write in the meantime removes it
+    pending = (None, None, time.time() + TASKS_CACHE_TTL)
+    with tasks_cache_lock:
+        store_tasks_entry(user_id, pending)
+    return pending
+
+def cache_tasks(user_id, pending, body):
+    # The ETag is a hash of the exact bytes, so it changes whenever the list does
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    # Skip the store if a write (or a newer load) replaced the placeholder
+    with tasks_cache_lock:
+        if tasks_cache.get(user_id) is pending:
+            store_tasks_entry(user_id, (body, etag, time.time() + TASKS_CACHE_TTL))
+    return etag
+
+def invalidate_tasks(user_id):
+    with tasks_cache_lock:
+        tasks_cache.pop(user_id, None)
 
 # Task breakdown function (placeholder - integrate your Gemini logic here)
 def breakdown_task(task_title, user_id):
@@ -965,6 +1286,18 @@ HTML_CONTENT = '''<!DOCTYPE html>
             box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
         }
 
+        .wallet-input.invalid {
+            border-color: #f56565;
+        }
+
+        .wallet-hint {
+            font-size: 12px;
+            color: #c53030;
+            margin-top: 6px;
+            text-align: left;
+            display: none;
+        }
+
         .close-modal-btn {
             padding: 14px 40px;
             font-size: 16px;
@@ -1003,6 +1336,28 @@ HTML_CONTENT = '''<!DOCTYPE html>
             <div class="empty-state">No tasks yet. Add one above!</div>
         </div>
 
+        <!-- Parsed once; renderTasks clones these and fills them via textContent -->
+        <template id="taskTpl">
+            <div class="task-header">
+                <div class="task-main">
+                    <span class="task-checkbox"></span>
+                    <span class="task-text"></span>
+                </div>
+                <div class="task-actions">
+                    <button class="expand-btn">▼</button>
+                    <button class="delete-btn">×</button>
+                </div>
+            </div>
+        </template>
+
+        <template id="subtaskTpl">
+            <div class="subtask-item">
+                <div class="subtask-checkbox"></div>
+                <div class="subtask-text"></div>
+                <div class="subtask-time"></div>
+            </div>
+        </template>
+
         <div class="session-section">
             <div class="timer-display" id="timerDisplay">00:00:00</div>
             <div class="session-controls">
@@ -1042,9 +1397,10 @@ HTML_CONTENT = '''<!DOCTYPE html>
                     type="text" 
                     class="wallet-input" 
                     id="walletInput" 
-                    placeholder="Enter your wallet address (any crypto)"
+                    placeholder="Enter your Solana wallet address"
                     autocomplete="off"
                 >
+                <div class="wallet-hint" id="walletHint">That doesn't look like a Solana address</div>
             </div>
             
             <button class="close-modal-btn" id="closeModalBtn">Continue</button>
@@ -1055,10 +1411,29 @@ HTML_CONTENT = '''<!DOCTYPE html>
         let tasks = [];
         let sessionRunning = false;
         let sessionStartTime = null;
-        let timerInterval = null;
+        let sessionStartPerf = null;  // monotonic anchor for elapsed time; sessionStartTime is for reporting
+        let timerFrame = null;
         let currentSessionId = null;
         let creditsEarned = 0;
 
+        // Elements the handlers touch, looked up once (the script runs after the markup)
+        const EL = {
+            tasksList: document.getElementById('tasksList'),
+            taskInput: document.getElementById('taskInput'),
+            addBtn: document.getElementById('addBtn'),
+            startBtn: document.getElementById('startBtn'),
+            stopBtn: document.getElementById('stopBtn'),
+            finishBtn: document.getElementById('finishBtn'),
+            timer: document.getElementById('timerDisplay'),
+            modalDuration: document.getElementById('modalDuration'),
+            modalTasksCompleted: document.getElementById('modalTasksCompleted'),
+            credits: document.getElementById('creditsEarned'),
+            congratsModal: document.getElementById('congratsModal'),
+            walletInput: document.getElementById('walletInput'),
+            walletHint: document.getElementById('walletHint'),
+            closeModalBtn: document.getElementById('closeModalBtn')
+        };
+
         function logout() {
             fetch('/api/logout', { method: 'POST' })
                 .then(() => {
@@ -1081,41 +1456,129 @@ HTML_CONTENT = '''<!DOCTYPE html>
             }
         }
 
-        async function saveTasks() {
+        // Serialized form of each task, reused as its render fingerprint until the task is mutated
+        const taskJsonCache = new WeakMap();
+
+        function taskJson(task) {
+            let json = taskJsonCache.get(task);
+            if (json === undefined) {
+                json = JSON.stringify(task);
+                taskJsonCache.set(task, json);
+            }
+            return json;
+        }
+
+        function invalidateTaskJson(task) {
+            taskJsonCache.delete(task);
+        }
+
+        // Creates still in flight, so edits and deletes can wait for the task's id
+        const pendingCreates = new WeakMap();
+
+        function createTask(task) {
+            const created = (async () => {
+                try {
+                    const response = await fetch('/api/tasks', {
+                        method: 'POST',
+                        headers: {'Content-Type': 'application/json'},
+                        body: JSON.stringify(task)
+                    });
+                    
+                    const result = await response.json();
+                    if (result.success) {
+                        adoptTaskId(task, result.id);
+                    }
+                } catch (error) {
+                    console.error('Save failed:', error);
+                }
+                pendingCreates.delete(task);
+            })();
+            pendingCreates.set(task, created);
+            return created;
+        }
+
+        function adoptTaskId(task, id) {
+            // The rendered node stays under the local key the task was first drawn with
+            task.id = id;
+            invalidateTaskJson(task);
+        }
+
+        async function savedTaskId(task) {
+            if (!task.id) await pendingCreates.get(task);
+            return task.id;
+        }
+
+        // Changed fields waiting to go out, merged per task so a burst of clicks is one PATCH
+        const pendingPatches = new Map();
+        let patchTimer = null;
+
+        function patchTask(task, fields) {
+            pendingPatches.set(task, Object.assign(pendingPatches.get(task) || {}, fields));
+            clearTimeout(patchTimer);
+            patchTimer = setTimeout(flushPatches, 200);
+        }
+
+        function flushPatches() {
+            clearTimeout(patchTimer);
+            patchTimer = null;
+            for (const [task, fields] of pendingPatches) {
+                sendPatch(task, fields);
+            }
+            pendingPatches.clear();
+        }
+
+        async function sendPatch(task, fields) {
+            const id = await savedTaskId(task);
+            if (!id) return;
             try {
-                await fetch('/api/tasks', {
-                    method: 'POST',
+                // keepalive lets the request outlive the page when it is flushed on hide
+                await fetch(`/api/tasks/${id}`, {
+                    method: 'PATCH',
                     headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify(tasks)
+                    body: JSON.stringify(fields),
+                    keepalive: true
                 });
             } catch (error) {
-                console.error('Save failed:', error);
+                console.error('Update failed:', error);
+            }
+        }
+
+        async function removeTask(task) {
+            pendingPatches.delete(task);
+            const id = await savedTaskId(task);
+            if (!id) return;
+            try {
+                await fetch(`/api/tasks/${id}`, { method: 'DELETE' });
+            } catch (error) {
+                console.error('Delete failed:', error);
             }
         }
 
-        async function requestBreakdown(taskId) {
+        async function requestBreakdown(task) {
             try {
                 const response = await fetch('/api/breakdown', {
                     method: 'POST',
                     headers: {'Content-Type': 'application/json'},
-                    body: JSON.stringify({ taskId })
+                    body: JSON.stringify({ taskId: task.id })
                 });
                 
                 const result = await response.json();
                 
                 if (result.success) {
-                    // Reload tasks to get updated breakdown
-                    await loadTasks();
+                    task.sections = result.sections;
+                    task.needsBreakdown = false;
+                    remainingCounts.delete(task);
+                    invalidateTaskJson(task);
+                    refreshTaskRow(task);
                 }
             } catch (error) {
                 console.error('Breakdown failed:', error);
             }
         }
 
-        function toggleSubtasks(taskIndex) {
-            const task = tasks[taskIndex];
-            const container = document.querySelector(`#task-${taskIndex} .subtasks-container`);
-            const expandBtn = document.querySelector(`#task-${taskIndex} .expand-btn`);
+        function toggleSubtasks(taskDiv) {
+            const container = taskDiv.querySelector('.subtasks-container');
+            const expandBtn = taskDiv.querySelector('.expand-btn');
             
             if (!container) return;
             
@@ -1128,28 +1591,57 @@ HTML_CONTENT = '''<!DOCTYPE html>
             }
         }
 
-        function toggleSubtask(taskIndex, sectionIndex, subtaskIndex) {
-            const task = tasks[taskIndex];
+        // Number of unfinished subtasks per task, kept in step by toggleSubtask
+        const remainingCounts = new WeakMap();
+
+        function remainingSubtasks(task) {
+            let remaining = remainingCounts.get(task);
+            if (remaining === undefined) {
+                remaining = 0;
+                for (const section of task.sections) {
+                    for (const item of section.items) {
+                        if (!item.done) remaining++;
+                    }
+                }
+                remainingCounts.set(task, remaining);
+            }
+            return remaining;
+        }
+
+        function toggleSubtask(task, sectionIndex, subtaskIndex) {
             if (!task.sections || !task.sections[sectionIndex]) return;
             
             const subtask = task.sections[sectionIndex].items[subtaskIndex];
+            let remaining = remainingSubtasks(task);
             subtask.done = !subtask.done;
+            remaining += subtask.done ? -1 : 1;
+            remainingCounts.set(task, remaining);
             
-            // Check if all subtasks in all sections are done
-            let allDone = true;
-            for (const section of task.sections) {
-                for (const item of section.items) {
-                    if (!item.done) {
-                        allDone = false;
-                        break;
-                    }
-                }
-                if (!allDone) break;
+            task.done = remaining === 0;
+            invalidateTaskJson(task);
+            patchTask(task, {
+                [`sections.${sectionIndex}.items.${subtaskIndex}.done`]: subtask.done,
+                done: task.done
+            });
+            patchSubtask(task, sectionIndex, subtaskIndex);
+        }
+
+        function patchSubtask(task, sectionIndex, subtaskIndex) {
+            // Flip the classes on the existing nodes instead of re-rendering the task
+            const entry = renderedTasks.get(taskKey(task));
+            if (!entry) return renderTasks();
+            
+            let flatIndex = subtaskIndex;
+            for (let i = 0; i < sectionIndex; i++) {
+                flatIndex += task.sections[i].items.length;
             }
             
-            task.done = allDone;
-            saveTasks();
-            renderTasks();
+            const done = task.sections[sectionIndex].items[subtaskIndex].done;
+            const itemEl = entry.el.querySelectorAll('.subtask-item')[flatIndex];
+            itemEl.classList.toggle('done', done);
+            itemEl.querySelector('.subtask-checkbox').classList.toggle('checked', done);
+            entry.el.querySelector('.task-checkbox').textContent = task.done ? '✓' : '○';
+            entry.fingerprint = taskJson(task);
         }
 
         function formatTime(seconds) {
@@ -1159,7 +1651,19 @@ HTML_CONTENT = '''<!DOCTYPE html>
             return `${String(h).padStart(2, '0')}:${String(m).padStart(2, '0')}:${String(s).padStart(2, '0')}`;
         }
 
+        // Subtask durations repeat a handful of values: format each one once
+        const durationLabels = new Map();
+
         function formatDuration(seconds) {
+            let label = durationLabels.get(seconds);
+            if (label === undefined) {
+                label = durationLabel(seconds);
+                durationLabels.set(seconds, label);
+            }
+            return label;
+        }
+
+        function durationLabel(seconds) {
             if (seconds < 60) return `${seconds}s`;
             const m = Math.floor(seconds / 60);
             if (m < 60) return `${m}m`;
@@ -1168,73 +1672,161 @@ HTML_CONTENT = '''<!DOCTYPE html>
             return `${h}h ${rm}m`;
         }
 
+        // Rendered task nodes keyed by task, reused across renders; each entry is
+        // { el, fingerprint, task } and the fingerprint is the task's JSON
+        const renderedTasks = new Map();
+        // A task keeps the key it was first rendered under: its id, or a local key
+        // if it was drawn before its create came back
+        const taskKeys = new WeakMap();
+        let nextLocalKey = 0;
+
+        function taskKey(task) {
+            let key = taskKeys.get(task);
+            if (key === undefined) {
+                key = task.id || `new-${nextLocalKey++}`;
+                taskKeys.set(task, key);
+            }
+            return key;
+        }
+
+        const taskTpl = document.getElementById('taskTpl');
+        const subtaskTpl = document.getElementById('subtaskTpl');
+
+        function buildTaskItem(taskDiv, task, key) {
+            const wasExpanded = taskDiv.querySelector('.subtasks-container.expanded') !== null;
+            taskDiv.className = 'task-item';
+            taskDiv.dataset.key = key;
+            
+            const hasSubtasks = task.sections && task.sections.length > 0;
+            const content = taskTpl.content.cloneNode(true);
+            content.querySelector('.task-checkbox').textContent = task.done ? '✓' : '○';
+            content.querySelector('.task-text').textContent = task.task;
+            
+            const expandBtn = content.querySelector('.expand-btn');
+            if (hasSubtasks) {
+                const container = buildSubtasks(task);
+                if (wasExpanded) {
+                    container.classList.add('expanded');
+                    expandBtn.textContent = '▲';
+                }
+                content.appendChild(container);
+            } else {
+                expandBtn.remove();
+                if (task.needsBreakdown) {
+                    const container = document.createElement('div');
+                    container.className = 'subtasks-container';
+                    const status = document.createElement('div');
+                    status.className = 'breakdown-status loading';
+                    status.textContent = '⏳ Breaking down task...';
+                    container.appendChild(status);
+                    content.appendChild(container);
+                }
+            }
+            
+            taskDiv.replaceChildren(content);
+        }
+
+        function buildSubtasks(task) {
+            const container = document.createElement('div');
+            container.className = 'subtasks-container';
+            
+            task.sections.forEach((section, sIdx) => {
+                const title = document.createElement('div');
+                title.className = 'section-title';
+                title.textContent = section.title;
+                container.appendChild(title);
+                
+                section.items.forEach((subtask, stIdx) => {
+                    const item = subtaskTpl.content.firstElementChild.cloneNode(true);
+                    item.classList.toggle('done', !!subtask.done);
+                    item.dataset.si = sIdx;
+                    item.dataset.sti = stIdx;
+                    item.querySelector('.subtask-checkbox').classList.toggle('checked', !!subtask.done);
+                    item.querySelector('.subtask-text').textContent = subtask.task;
+                    item.querySelector('.subtask-time').textContent = formatDuration(subtask.expectedTime);
+                    container.appendChild(item);
+                });
+            });
+            
+            return container;
+        }
+
         function renderTasks() {
-            const tasksList = document.getElementById('tasksList');
+            const tasksList = EL.tasksList;
             
             if (tasks.length === 0) {
+                renderedTasks.clear();
                 tasksList.innerHTML = '<div class="empty-state">No tasks yet. Add one above!</div>';
                 return;
             }
 
-            tasksList.innerHTML = '';
+            const keys = tasks.map(taskKey);
+            const live = new Set(keys);
+            for (const [key, entry] of renderedTasks) {
+                if (!live.has(key)) {
+                    entry.el.remove();
+                    renderedTasks.delete(key);
+                }
+            }
+
+            // First paint builds into a detached fragment and attaches it once
+            const initial = renderedTasks.size === 0;
+            if (initial) tasksList.textContent = '';
+            const parent = initial ? document.createDocumentFragment() : tasksList;
+            let cursor = initial ? null : tasksList.firstChild;
+
             tasks.forEach((task, index) => {
-                const taskDiv = document.createElement('div');
-                taskDiv.className = 'task-item';
-                taskDiv.id = `task-${index}`;
-                
-                const hasSubtasks = task.sections && task.sections.length > 0;
-                const subtasksCount = hasSubtasks ? 
-                    task.sections.reduce((sum, sec) => sum + sec.items.length, 0) : 0;
-                
-                let subtasksHTML = '';
-                if (hasSubtasks) {
-                    subtasksHTML = '<div class="subtasks-container">';
-                    
-                    task.sections.forEach((section, sIdx) => {
-                        subtasksHTML += `<div class="section-title">${escapeHtml(section.title)}</div>`;
-                        
-                        section.items.forEach((subtask, stIdx) => {
-                            subtasksHTML += `
-                                <div class="subtask-item ${subtask.done ? 'done' : ''}" onclick="toggleSubtask(${index}, ${sIdx}, ${stIdx})">
-                                    <div class="subtask-checkbox ${subtask.done ? 'checked' : ''}"></div>
-                                    <div class="subtask-text">${escapeHtml(subtask.task)}</div>
-                                    <div class="subtask-time">${formatDuration(subtask.expectedTime)}</div>
-                                </div>
-                            `;
-                        });
-                    });
-                    
-                    subtasksHTML += '</div>';
-                } else if (task.needsBreakdown) {
-                    subtasksHTML = '<div class="subtasks-container"><div class="breakdown-status loading">⏳ Breaking down task...</div></div>';
+                let entry = renderedTasks.get(keys[index]);
+                if (!entry) {
+                    entry = { el: document.createElement('div'), fingerprint: null, task };
+                    renderedTasks.set(keys[index], entry);
                 }
                 
-                taskDiv.innerHTML = `
-                    <div class="task-header">
-                        <div class="task-main">
-                            <span class="task-checkbox">${task.done ? '✓' : '○'}</span>
-                            <span class="task-text">${escapeHtml(task.task)}</span>
-                        </div>
-                        <div class="task-actions">
-                            ${hasSubtasks ? `<button class="expand-btn" onclick="toggleSubtasks(${index})">▼</button>` : ''}
-                            <button class="delete-btn" onclick="deleteTask(${index})">×</button>
-                        </div>
-                    </div>
-                    ${subtasksHTML}
-                `;
+                const fingerprint = taskJson(task);
+                if (entry.fingerprint !== fingerprint) {
+                    buildTaskItem(entry.el, task, keys[index]);
+                    entry.fingerprint = fingerprint;
+                }
                 
-                tasksList.appendChild(taskDiv);
+                if (entry.el === cursor) {
+                    cursor = cursor.nextSibling;
+                } else {
+                    parent.insertBefore(entry.el, cursor);
+                }
             });
+
+            if (initial) tasksList.appendChild(parent);
+        }
+
+        // Single-row updates for add, delete and breakdown; renderTasks walks every row
+        function appendTaskRow(task) {
+            // The first row replaces the empty state
+            if (renderedTasks.size === 0) EL.tasksList.textContent = '';
+            const key = taskKey(task);
+            const entry = { el: document.createElement('div'), fingerprint: taskJson(task), task };
+            buildTaskItem(entry.el, task, key);
+            renderedTasks.set(key, entry);
+            EL.tasksList.appendChild(entry.el);
         }
 
-        function escapeHtml(text) {
-            const div = document.createElement('div');
-            div.textContent = text;
-            return div.innerHTML;
+        function removeTaskRow(task) {
+            const key = taskKey(task);
+            const entry = renderedTasks.get(key);
+            if (!entry || tasks.length === 0) return renderTasks();
+            entry.el.remove();
+            renderedTasks.delete(key);
+        }
+
+        function refreshTaskRow(task) {
+            const key = taskKey(task);
+            const entry = renderedTasks.get(key);
+            if (!entry) return renderTasks();
+            buildTaskItem(entry.el, task, key);
+            entry.fingerprint = taskJson(task);
         }
 
         async function addTask() {
-            const input = document.getElementById('taskInput');
+            const input = EL.taskInput;
             const taskText = input.value.trim();
             
             if (taskText) {
@@ -1250,32 +1842,30 @@ HTML_CONTENT = '''<!DOCTYPE html>
                 };
                 
                 tasks.push(newTask);
-                await saveTasks();
-                await loadTasks();  // Reload to get the task ID
-                
-                // Find the newly added task and request breakdown
-                const addedTask = tasks.find(t => t.task === taskText && t.needsBreakdown);
-                if (addedTask && addedTask.id) {
-                    requestBreakdown(addedTask.id);
-                }
-                
+                appendTaskRow(newTask);
                 input.value = '';
                 input.focus();
+                
+                // The breakdown request needs the new task's id
+                await createTask(newTask);
+                if (newTask.id) {
+                    requestBreakdown(newTask);
+                }
             }
         }
 
-        function deleteTask(index) {
-            if (confirm(`Delete task: "${tasks[index].task}"?`)) {
-                tasks.splice(index, 1);
-                saveTasks();
-                renderTasks();
+        function deleteTask(task) {
+            if (confirm(`Delete task: "${task.task}"?`)) {
+                tasks.splice(tasks.indexOf(task), 1);
+                removeTaskRow(task);
+                removeTask(task);
             }
         }
 
         async function endSession() {
             if (!sessionStartTime) return;
             
-            const sessionDuration = Math.floor((Date.now() - sessionStartTime) / 1000);
+            const sessionDuration = Math.floor((performance.now() - sessionStartPerf) / 1000);
             const tasksCompleted = tasks.filter(t => t.done).length;
             
             creditsEarned = calculateCredits(sessionDuration);
@@ -1304,30 +1894,31 @@ HTML_CONTENT = '''<!DOCTYPE html>
             
             sessionRunning = false;
             sessionStartTime = null;
+            sessionStartPerf = null;
             currentSessionId = null;
-            clearInterval(timerInterval);
+            cancelAnimationFrame(timerFrame);
             
-            document.getElementById('startBtn').textContent = 'Start Session';
-            document.getElementById('startBtn').classList.remove('hidden');
-            document.getElementById('stopBtn').classList.add('hidden');
-            document.getElementById('finishBtn').classList.add('hidden');
+            EL.startBtn.textContent = 'Start Session';
+            EL.startBtn.classList.remove('hidden');
+            EL.stopBtn.classList.add('hidden');
+            EL.finishBtn.classList.add('hidden');
             
-            const display = document.getElementById('timerDisplay');
-            display.classList.remove('running');
-            display.textContent = '00:00:00';
+            EL.timer.classList.remove('running');
+            EL.timer.textContent = '00:00:00';
+            nextSecondAt = 0;
         }
 
         function showCongratsModal(duration, tasksCompleted) {
-            document.getElementById('modalDuration').textContent = formatTime(duration);
-            document.getElementById('modalTasksCompleted').textContent = tasksCompleted;
-            document.getElementById('creditsEarned').textContent = creditsEarned.toFixed(2);
+            EL.modalDuration.textContent = formatTime(duration);
+            EL.modalTasksCompleted.textContent = tasksCompleted;
+            EL.credits.textContent = creditsEarned.toFixed(2);
             
-            const modal = document.getElementById('congratsModal');
+            const modal = EL.congratsModal;
             modal.classList.add('show');
         }
 
         async function closeCongratsModal() {
-            const walletInput = document.getElementById('walletInput');
+            const walletInput = EL.walletInput;
             const walletAddress = walletInput.value.trim();
             
             if (!walletAddress) {
@@ -1336,7 +1927,13 @@ HTML_CONTENT = '''<!DOCTYPE html>
                 return;
             }
             
-            const continueBtn = document.getElementById('closeModalBtn');
+            if (!validateSolanaAddress(walletAddress)) {
+                updateWalletHint();
+                walletInput.focus();
+                return;
+            }
+            
+            const continueBtn = EL.closeModalBtn;
             continueBtn.disabled = true;
             continueBtn.textContent = 'Processing...';
             
@@ -1356,10 +1953,11 @@ HTML_CONTENT = '''<!DOCTYPE html>
                 if (result.success) {
                     alert(`🎉 Success! ${creditsEarned.toFixed(2)} credits sent!`);
                     
-                    const modal = document.getElementById('congratsModal');
+                    const modal = EL.congratsModal;
                     modal.classList.remove('show');
                     
                     walletInput.value = '';
+                    updateWalletHint();
                     creditsEarned = 0;
                 }
             } catch (error) {
@@ -1370,10 +1968,45 @@ HTML_CONTENT = '''<!DOCTYPE html>
             }
         }
 
+        let nextSecondAt = 0;
+
+        // Solana addresses are base58-encoded 32-byte keys: 32-44 chars, no 0/O/I/l
+        const SOLANA_ADDRESS_RE = /^[1-9A-HJ-NP-Za-km-z]{32,44}$/;
+        let lastCheckedAddress = '';
+        let lastAddressValid = false;
+
+        function validateSolanaAddress(address) {
+            if (address !== lastCheckedAddress) {
+                lastCheckedAddress = address;
+                lastAddressValid = SOLANA_ADDRESS_RE.test(address);
+            }
+            return lastAddressValid;
+        }
+
+        let walletHintShown = false;
+        let walletCheckTimer = null;
+
+        function updateWalletHint() {
+            const walletInput = EL.walletInput;
+            const address = walletInput.value.trim();
+            const show = address !== '' && !validateSolanaAddress(address);
+            if (show === walletHintShown) return;
+            
+            walletHintShown = show;
+            walletInput.classList.toggle('invalid', show);
+            EL.walletHint.style.display = show ? 'block' : 'none';
+        }
+
         function updateTimer() {
             if (!sessionRunning) return;
-            const elapsed = Math.floor((Date.now() - sessionStartTime) / 1000);
-            document.getElementById('timerDisplay').textContent = formatTime(elapsed);
+            const now = performance.now();
+            // Runs once per frame; most frames only compare against the next second boundary
+            if (now >= nextSecondAt) {
+                const elapsed = Math.floor((now - sessionStartPerf) / 1000);
+                EL.timer.textContent = formatTime(elapsed);
+                nextSecondAt = sessionStartPerf + (elapsed + 1) * 1000;
+            }
+            timerFrame = requestAnimationFrame(updateTimer);
         }
 
         function startSession() {
@@ -1386,39 +2019,64 @@ HTML_CONTENT = '''<!DOCTYPE html>
             
             if (!sessionStartTime) {
                 sessionStartTime = Date.now();
+                sessionStartPerf = performance.now();
                 currentSessionId = 'session_' + Date.now();
             }
             
-            document.getElementById('startBtn').classList.add('hidden');
-            document.getElementById('stopBtn').classList.remove('hidden');
-            document.getElementById('finishBtn').classList.remove('hidden');
+            EL.startBtn.classList.add('hidden');
+            EL.stopBtn.classList.remove('hidden');
+            EL.finishBtn.classList.remove('hidden');
             
-            const display = document.getElementById('timerDisplay');
-            display.classList.add('running');
+            EL.timer.classList.add('running');
             
-            timerInterval = setInterval(updateTimer, 1000);
+            timerFrame = requestAnimationFrame(updateTimer);
         }
 
         function stopSession() {
             sessionRunning = false;
-            clearInterval(timerInterval);
+            cancelAnimationFrame(timerFrame);
             
-            document.getElementById('startBtn').textContent = 'Continue Session';
-            document.getElementById('startBtn').classList.remove('hidden');
-            document.getElementById('stopBtn').classList.add('hidden');
-            document.getElementById('finishBtn').classList.add('hidden');
+            EL.startBtn.textContent = 'Continue Session';
+            EL.startBtn.classList.remove('hidden');
+            EL.stopBtn.classList.add('hidden');
+            EL.finishBtn.classList.add('hidden');
             
-            document.getElementById('timerDisplay').classList.remove('running');
+            EL.timer.classList.remove('running');
         }
 
-        document.getElementById('addBtn').addEventListener('click', addTask);
-        document.getElementById('taskInput').addEventListener('keypress', (e) => {
+        // One delegated listener for every task row instead of inline handlers per node
+        EL.tasksList.addEventListener('click', (e) => {
+            const target = e.target.closest('.subtask-item, .expand-btn, .delete-btn');
+            if (!target) return;
+            
+            const taskDiv = target.closest('.task-item');
+            const entry = renderedTasks.get(taskDiv.dataset.key);
+            if (!entry) return;
+            if (target.classList.contains('subtask-item')) {
+                toggleSubtask(entry.task, +target.dataset.si, +target.dataset.sti);
+            } else if (target.classList.contains('expand-btn')) {
+                toggleSubtasks(taskDiv);
+            } else {
+                deleteTask(entry.task);
+            }
+        });
+        EL.addBtn.addEventListener('click', addTask);
+        EL.taskInput.addEventListener('keypress', (e) => {
             if (e.key === 'Enter') addTask();
         });
-        document.getElementById('startBtn').addEventListener('click', startSession);
-        document.getElementById('stopBtn').addEventListener('click', stopSession);
-        document.getElementById('finishBtn').addEventListener('click', endSession);
-        document.getElementById('closeModalBtn').addEventListener('click', closeCongratsModal);
+        EL.startBtn.addEventListener('click', startSession);
+        EL.stopBtn.addEventListener('click', stopSession);
+        EL.finishBtn.addEventListener('click', endSession);
+        EL.closeModalBtn.addEventListener('click', closeCongratsModal);
+        EL.walletInput.addEventListener('input', () => {
+            // Wait for a pause in typing before validating
+            clearTimeout(walletCheckTimer);
+            walletCheckTimer = setTimeout(updateWalletHint, 150);
+        });
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') flushPatches();
+        });
+        window.addEventListener('pagehide', flushPatches);
 
         loadTasks();
     </script>
@@ -1426,27 +2084,46 @@ HTML_CONTENT = '''<!DOCTYPE html>
 </html>
 '''
 
+# The pages are static: encode and gzip each one once at import
+def encode_page(html):
+    raw = html.encode('utf-8')
+    # Strong validator from the page bytes; the gzip variant gets its own, as the bytes differ
+    digest = hashlib.sha256(raw).hexdigest()[:32]
+    return raw, gzip.compress(raw, 9), f'"{digest}"', f'"{digest}-gz"'
+
+LOGIN_PAGE = encode_page(LOGIN_HTML)
+REGISTER_PAGE = encode_page(REGISTER_HTML)
+APP_PAGE = encode_page(HTML_CONTENT)
+
 
-class JSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+def json_default(obj):
+    # orjson handles datetime natively; ObjectId is the only Mongo type left over
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
 class TodoHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep-alive: every response carries a Content-Length so the browser can reuse
+    # the connection; idle connections are dropped after the timeout
+    protocol_version = 'HTTP/1.1'
+    timeout = 30
+    # Buffer the response so status line, headers and body leave in one send when
+    # handle_one_request flushes, instead of a separate small write for the headers
+    wbufsize = 1 << 16
+    
+    def handle_expect_100(self):
+        # The interim 100 must go out now: the client waits for it before sending the body
+        result = super().handle_expect_100()
+        self.wfile.flush()
+        return result
+    
     def get_session_token(self):
         cookie_header = self.headers.get('Cookie')
         if not cookie_header:
             return None
         
-        cookies = SimpleCookie()
-        cookies.load(cookie_header)
-        
-        if 'session_token' in cookies:
-            return cookies['session_token'].value
-        return None
+        match = SESSION_COOKIE_RE.search(cookie_header)
+        return match.group(1) if match else None
     
     def get_current_user(self):
         token = self.get_session_token()
@@ -1459,313 +2136,503 @@ class TodoHandler(http.server.SimpleHTTPRequestHandler):
         if not user_id:
             self.send_response(302)
             self.send_header('Location', '/login')
+            self.send_header('Content-Length', '0')
             self.end_headers()
             return None
         return user_id
     
-    def do_GET(self):
-        if self.path == '/login':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
+    def read_body(self):
+        # Bounded read into one preallocated buffer; sends the error and returns None if unusable
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400)
+            return None
+        if length > MAX_BODY:
+            self.send_error(413)
+            return None
+        if length == 0:
+            return b'{}'
+        
+        body = bytearray(length)
+        view = memoryview(body)
+        received = 0
+        while received < length:
+            n = self.rfile.readinto(view[received:])
+            if not n:
+                self.send_error(400)
+                return None
+            received += n
+        return body
+    
+    def send_json(self, body, cookie=None, status=200, headers=None):
+        if not isinstance(body, bytes):
+            body = orjson.dumps(body)
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        if cookie:
+            self.send_header('Set-Cookie', cookie)
+        if headers:
+            for name, value in headers.items():
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_page(self, page, cache_control):
+        raw, gzipped, raw_etag, gzip_etag = page
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = gzipped if use_gzip else raw
+        etag = gzip_etag if use_gzip else raw_etag
+        
+        # The pages only change on deploy: a revalidating browser gets a bodiless 304
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Cache-Control', cache_control)
             self.end_headers()
-            self.wfile.write(LOGIN_HTML.encode())
-            
-        elif self.path == '/register':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'text/html')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def get_login_page(self):
+        self.send_page(LOGIN_PAGE, 'public, max-age=3600')
+    
+    def get_register_page(self):
+        self.send_page(REGISTER_PAGE, 'public, max-age=3600')
+    
+    def get_app_page(self):
+        user_id = self.require_auth()
+        if not user_id:
+            return
+        
+        # Not cached: a cached copy would skip the login redirect after logout
+        self.send_page(APP_PAGE, 'private, no-cache')
+    
+    def get_tasks(self):
+        user_id = self.require_auth()
+        if not user_id:
+            return
+        
+        cached = get_cached_tasks(user_id)
+        if cached is not None:
+            body, etag = cached
+        else:
+            pending = start_tasks_load(user_id)
+            # Mongo renames _id to a string id, so documents come back ready to encode
+            tasks = list(tasks_collection.aggregate([
+                {'$match': {'userId': user_id, 'archived': False}},
+                {'$sort': {'_id': 1}},
+                {'$project': {'_id': 0, 'id': {'$toString': '$_id'},
+                              'task': 1, 'done': 1, 'expectedTime': 1, 'actualTime': 1,
+                              'createdAt': 1, 'sections': 1, 'needsBreakdown': 1}},
+            ]))
+            body = orjson.dumps(tasks, default=json_default)
+            etag = cache_tasks(user_id, pending, body)
+        
+        # no-cache makes the browser revalidate; an unchanged list costs a bodiless 304
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'private, no-cache')
             self.end_headers()
-            self.wfile.write(REGISTER_HTML.encode())
+            return
+        
+        self.send_json(body, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+    
+    def post_register(self, data):
+        try:
+            username = data.get('username', '').strip()
+            password = data.get('password', '')
             
-        elif self.path == '/' or self.path == '/index.html':
-            user_id = self.require_auth()
-            if not user_id:
+            if len(username) < 3:
+                self.send_json({
+                    'success': False,
+                    'message': 'Username must be at least 3 characters'
+                })
                 return
             
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(HTML_CONTENT.encode())
+            if len(password) < 6:
+                self.send_json({
+                    'success': False,
+                    'message': 'Password must be at least 6 characters'
+                })
+                return
             
-        elif self.path == '/api/tasks':
-            user_id = self.require_auth()
-            if not user_id:
+            if users_collection.find_one({'username': username}):
+                self.send_json({
+                    'success': False,
+                    'message': 'Username already exists'
+                })
                 return
             
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
+            hashed_password = hash_password(password)
+            users_collection.insert_one({
+                'username': username,
+                'password': hashed_password,
+                'createdAt': datetime.now().isoformat()
+            })
             
-            tasks = list(tasks_collection.find(
-                {'userId': user_id, 'archived': False},
-                {'task': 1, 'done': 1, 'expectedTime': 1, 'actualTime': 1,
-                 'createdAt': 1, 'sections': 1, 'subtasks': 1, 'needsBreakdown': 1}
-            ).sort('_id', 1))
+            logger.info("New user registered: %s", username)
             
-            for task in tasks:
-                task['id'] = str(task['_id'])
-                del task['_id']
+            self.send_json({
+                'success': True,
+                'message': 'Account created successfully'
+            })
+            
+        except Exception:
+            logger.exception("Registration error")
+            self.send_error(500)
+    
+    def post_login(self, data):
+        try:
+            username = data.get('username', '').strip()
+            password = data.get('password', '')
             
-            self.wfile.write(json.dumps(tasks, cls=JSONEncoder).encode())
+            user = users_collection.find_one({'username': username}, {'password': 1})
             
-        else:
-            self.send_error(404)
+            if not user or not verify_password(password, user['password']):
+                self.send_json({
+                    'success': False,
+                    'message': 'Invalid username or password'
+                })
+                return
+            
+            if password_needs_rehash(user['password']):
+                users_collection.update_one(
+                    {'_id': user['_id']},
+                    {'$set': {'password': hash_password(password)}}
+                )
+            
+            session_token = create_session(str(user['_id']))
+            
+            logger.info("User logged in: %s", username)
+            
+            self.send_json({
+                'success': True,
+                'message': 'Login successful'
+            }, cookie=f'session_token={session_token}; Path=/; HttpOnly; Max-Age={SESSION_TTL}')
+            
+        except Exception:
+            logger.exception("Login error")
+            self.send_error(500)
     
-    def do_POST(self):
-        content_length = int(self.headers.get('Content-Length', 0))
-        post_data = self.rfile.read(content_length) if content_length > 0 else b'{}'
+    def post_logout(self, data):
+        session_token = self.get_session_token()
+        if session_token and session_token in sessions:
+            del sessions[session_token]
+        
+        self.send_json(b'{"success": true}', cookie='session_token=; Path=/; HttpOnly; Max-Age=0')
+    
+    def post_tasks(self, task):
+        user_id = self.get_current_user()
+        if not user_id:
+            self.send_error(401)
+            return
         
-        if self.path == '/api/register':
+        try:
             try:
-                data = json.loads(post_data)
-                username = data.get('username', '').strip()
-                password = data.get('password', '')
-                
-                if len(username) < 3:
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        'success': False,
-                        'message': 'Username must be at least 3 characters'
-                    }).encode())
-                    return
-                
-                if len(password) < 6:
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        'success': False,
-                        'message': 'Password must be at least 6 characters'
-                    }).encode())
-                    return
-                
-                if users_collection.find_one({'username': username}):
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        'success': False,
-                        'message': 'Username already exists'
-                    }).encode())
-                    return
-                
-                hashed_password = hash_password(password)
-                users_collection.insert_one({
-                    'username': username,
-                    'password': hashed_password,
-                    'createdAt': datetime.now().isoformat()
-                })
-                
-                print(f"✅ New user registered: {username}")
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'success': True,
-                    'message': 'Account created successfully'
-                }).encode())
-                
-            except Exception as e:
-                print(f"Registration error: {e}")
-                self.send_error(500)
-                
-        elif self.path == '/api/login':
+                cleaned = clean_new_task(task)
+            except (ValueError, TypeError):
+                cleaned = None
+            if cleaned is None:
+                self.send_error(400)
+                return
+            
+            # Creates one task; edits go through PATCH and removals through DELETE
+            task = cleaned
+            task['userId'] = user_id
+            task['archived'] = False
+            
+            result = tasks_collection.insert_one(task)
+            invalidate_tasks(user_id)
+            
+            self.send_json({'success': True, 'id': str(result.inserted_id)})
+            
+        except Exception:
+            logger.exception("Error creating task")
+            self.send_error(500)
+    
+    def post_breakdown(self, data):
+        user_id = self.get_current_user()
+        if not user_id:
+            self.send_error(401)
+            return
+        
+        try:
+            task_id = data.get('taskId')
+            if not isinstance(task_id, str) or not ObjectId.is_valid(task_id):
+                self.send_error(400)
+                return
+            oid = ObjectId(task_id)
+            
+            # Get the task
+            task = tasks_collection.find_one({
+                '_id': oid,
+                'userId': user_id
+            }, {'task': 1})
+            
+            if not task:
+                self.send_error(404)
+                return
+            
+            # Call breakdown function
+            breakdown_result = breakdown_task(task['task'], user_id)
+            
+            # Update task with breakdown
+            tasks_collection.update_one(
+                {'_id': oid},
+                {'$set': {
+                    'sections': breakdown_result['sections'],
+                    'needsBreakdown': False,
+                    'taskType': breakdown_result.get('taskType', 'other'),
+                    'paceMultiplier': breakdown_result.get('paceMultiplier', 1.0),
+                    'breakdownAt': datetime.now().isoformat()
+                }}
+            )
+            invalidate_tasks(user_id)
+            
+            self.send_json({
+                'success': True,
+                'sections': breakdown_result['sections']
+            })
+            
+        except Exception:
+            logger.exception("Breakdown error")
+            self.send_error(500)
+    
+    def post_session(self, session_data):
+        user_id = self.get_current_user()
+        if not user_id:
+            self.send_error(401)
+            return
+        
+        # Without a database the buffered write would never land
+        if not mongo_connected:
+            self.send_error(503)
+            return
+        
+        try:
             try:
-                data = json.loads(post_data)
-                username = data.get('username', '').strip()
-                password = data.get('password', '')
-                
-                user = users_collection.find_one({'username': username})
-                
-                if not user or not verify_password(password, user['password']):
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
-                    self.end_headers()
-                    self.wfile.write(json.dumps({
-                        'success': False,
-                        'message': 'Invalid username or password'
-                    }).encode())
-                    return
-                
-                session_token = create_session(str(user['_id']))
-                
-                print(f"✅ User logged in: {username}")
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.send_header('Set-Cookie', f'session_token={session_token}; Path=/; HttpOnly; Max-Age=2592000')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'success': True,
-                    'message': 'Login successful'
-                }).encode())
-                
-            except Exception as e:
-                print(f"Login error: {e}")
-                self.send_error(500)
-                
-        elif self.path == '/api/logout':
-            session_token = self.get_session_token()
-            if session_token and session_token in sessions:
-                del sessions[session_token]
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Set-Cookie', 'session_token=; Path=/; HttpOnly; Max-Age=0')
-            self.end_headers()
-            self.wfile.write(b'{"success": true}')
-                
-        elif self.path == '/api/tasks':
-            user_id = self.get_current_user()
-            if not user_id:
-                self.send_error(401)
+                fields = clean_session(session_data)
+            except (ValueError, TypeError):
+                fields = None
+            if fields is None:
+                self.send_error(400)
                 return
             
+            buffer_session_write(user_id, fields['sessionId'], fields)
+            
+            self.send_json(b'{"success": true}', status=202)
+            
+        except Exception:
+            logger.exception("Error saving session")
+            self.send_error(500)
+    
+    def post_credit_transfer(self, transfer_data):
+        user_id = self.get_current_user()
+        if not user_id:
+            self.send_error(401)
+            return
+        
+        # Without a database the queued record would never be written
+        if not mongo_connected:
+            self.send_error(503)
+            return
+        
+        try:
+            wallet_address = transfer_data.get('walletAddress')
+            if not isinstance(wallet_address, str) or not SOLANA_ADDRESS_RE.fullmatch(wallet_address):
+                self.send_error(400)
+                return
             try:
-                tasks = json.loads(post_data)
-                
-                tasks_collection.delete_many({'userId': user_id, 'archived': False})
-                
-                for task in tasks:
-                    task_id = task.pop('id', None)
-                    task['userId'] = user_id
-                    task['archived'] = False
-                    task['done'] = bool(task.get('done', False))
-                    task['expectedTime'] = int(task.get('expectedTime', 0))
-                    task['actualTime'] = int(task.get('actualTime', 0))
-                    task['needsBreakdown'] = bool(task.get('needsBreakdown', True))
-                    task['sections'] = task.get('sections', None)
-                    task['subtasks'] = task.get('subtasks', [])
-                    
-                    tasks_collection.insert_one(task)
-                
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"success": true}')
-                
-            except Exception as e:
-                print(f"Error saving tasks: {e}")
-                self.send_error(500)
+                credits = clean_amount(transfer_data.get('credits', 0))
+            except (ValueError, TypeError):
+                self.send_error(400)
+                return
+            session_id = transfer_data.get('sessionId')
+            if session_id is not None and not isinstance(session_id, str):
+                self.send_error(400)
+                return
+            
+            credit_record = {
+                'userId': user_id,
+                'walletAddress': wallet_address,
+                'credits': credits,
+                'sessionId': session_id,
+                'timestamp': datetime.now().isoformat(),
+                'status': 'pending'
+            }
+            
+            queue_credit_transfer(credit_record)
+            
+            self.send_json({
+                'success': True,
+                'credits': credits,
+                'walletAddress': wallet_address,
+                'message': 'Credit transfer queued'
+            }, status=202)
+            
+        except Exception:
+            logger.exception("Error transferring credits")
+            self.send_error(500)
+    
+    def do_GET(self):
+        handler = self.GET_ROUTES.get(self.path)
+        if handler is None:
+            self.send_error(404)
+            return
+        handler(self)
+    
+    def do_POST(self):
+        post_data = self.read_body()
+        if post_data is None:
+            return
+        
+        handler = self.POST_ROUTES.get(self.path)
+        if handler is None:
+            self.send_error(404)
+            return
         
-        elif self.path == '/api/breakdown':
+        # Every POST route takes a JSON object: parse and check it once here
+        try:
+            data = orjson.loads(post_data)
+        except orjson.JSONDecodeError:
+            self.send_error(400)
+            return
+        if not isinstance(data, dict):
+            self.send_error(400)
+            return
+        handler(self, data)
+    
+    def do_PATCH(self):
+        post_data = self.read_body()
+        if post_data is None:
+            return
+        
+        if self.path.startswith('/api/tasks/'):
             user_id = self.get_current_user()
             if not user_id:
                 self.send_error(401)
                 return
             
             try:
-                data = json.loads(post_data)
-                task_id = data.get('taskId')
-                
-                # Get the task
-                task = tasks_collection.find_one({
-                    '_id': ObjectId(task_id),
-                    'userId': user_id
-                })
-                
-                if not task:
-                    self.send_error(404)
+                task_id = self.path[len('/api/tasks/'):]
+                try:
+                    updates = clean_task_patch(orjson.loads(post_data))
+                except (orjson.JSONDecodeError, ValueError, TypeError):
+                    updates = None
+                if not ObjectId.is_valid(task_id) or updates is None:
+                    self.send_error(400)
                     return
                 
-                # Call breakdown function
-                breakdown_result = breakdown_task(task['task'], user_id)
-                
-                # Update task with breakdown
-                tasks_collection.update_one(
-                    {'_id': ObjectId(task_id)},
-                    {'$set': {
-                        'sections': breakdown_result['sections'],
-                        'needsBreakdown': False,
-                        'taskType': breakdown_result.get('taskType', 'other'),
-                        'paceMultiplier': breakdown_result.get('paceMultiplier', 1.0),
-                        'breakdownAt': datetime.now().isoformat()
-                    }}
+                # Dot paths let one subtask flip without rewriting the task document
+                result = tasks_collection.update_one(
+                    {'_id': ObjectId(task_id), 'userId': user_id},
+                    {'$set': updates}
                 )
+                invalidate_tasks(user_id)
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'success': True,
-                    'sections': breakdown_result['sections']
-                }).encode())
-                
-            except Exception as e:
-                print(f"Breakdown error: {e}")
-                self.send_error(500)
-                
-        elif self.path == '/api/session':
-            user_id = self.get_current_user()
-            if not user_id:
-                self.send_error(401)
-                return
-            
-            try:
-                session_data = json.loads(post_data)
-                session_data['userId'] = user_id
-                sessions_collection.insert_one(session_data)
+                if result.matched_count == 0:
+                    self.send_error(404)
+                    return
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(b'{"success": true}')
+                self.send_json(b'{"success": true}')
                 
-            except Exception as e:
-                print(f"Error saving session: {e}")
+            except Exception:
+                logger.exception("Error updating task")
                 self.send_error(500)
-                
-        elif self.path == '/api/credit-transfer':
+        else:
+            self.send_error(404)
+    
+    def do_DELETE(self):
+        if self.path.startswith('/api/tasks/'):
             user_id = self.get_current_user()
             if not user_id:
                 self.send_error(401)
                 return
             
             try:
-                transfer_data = json.loads(post_data)
-                wallet_address = transfer_data.get('walletAddress')
-                credits = transfer_data.get('credits', 0)
-                session_id = transfer_data.get('sessionId')
-                
-                credit_record = {
-                    'userId': user_id,
-                    'walletAddress': wallet_address,
-                    'credits': credits,
-                    'sessionId': session_id,
-                    'timestamp': datetime.now().isoformat(),
-                    'status': 'pending'
-                }
+                task_id = self.path[len('/api/tasks/'):]
+                if not ObjectId.is_valid(task_id):
+                    self.send_error(400)
+                    return
                 
-                credit_transfers_collection.insert_one(credit_record)
+                result = tasks_collection.delete_one({'_id': ObjectId(task_id), 'userId': user_id})
+                invalidate_tasks(user_id)
                 
-                print(f"💰 Credit Transfer: {credits} credits → {wallet_address}")
+                if result.deleted_count == 0:
+                    self.send_error(404)
+                    return
                 
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(json.dumps({
-                    'success': True,
-                    'credits': credits,
-                    'walletAddress': wallet_address,
-                    'message': 'Credits transferred successfully'
-                }).encode())
+                self.send_json(b'{"success": true}')
                 
-            except Exception as e:
-                print(f"Error transferring credits: {e}")
+            except Exception:
+                logger.exception("Error deleting task")
                 self.send_error(500)
         else:
             self.send_error(404)
     
+    # Exact-path routes: one dict lookup per request instead of an if/elif chain
+    GET_ROUTES = {
+        '/login': get_login_page,
+        '/register': get_register_page,
+        '/': get_app_page,
+        '/index.html': get_app_page,
+        '/api/tasks': get_tasks,
+    }
+    POST_ROUTES = {
+        '/api/register': post_register,
+        '/api/login': post_login,
+        '/api/logout': post_logout,
+        '/api/tasks': post_tasks,
+        '/api/breakdown': post_breakdown,
+        '/api/session': post_session,
+        '/api/credit-transfer': post_credit_transfer,
+    }
+    
     def log_message(self, format, *args):
         pass
 
 def open_browser():
     webbrowser.open(f'http://localhost:{PORT}')
 
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the record (message and traceback) so it can be
+    # pickled across processes; this queue never leaves the process, so hand the
+    # record over as-is and let the listener's handler do the formatting
+    def prepare(self, record):
+        return record
+
 if __name__ == '__main__':
-    with socketserver.TCPServer(("0.0.0.0", PORT), TodoHandler) as httpd:
+    # Request threads only enqueue log records; formatting and the stderr write
+    # happen on the listener's thread
+    log_queue = queue.Queue(-1)
+    log_output = logging.StreamHandler()
+    log_output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    log_listener = logging.handlers.QueueListener(log_queue, log_output)
+    logging.basicConfig(level=logging.INFO, handlers=[LocalQueueHandler(log_queue)])
+    log_listener.start()
+    # atexit runs handlers last-registered first, so the exit-time session flush
+    # (and anything it logs) happens before the listener stops
+    atexit.register(log_listener.stop)
+    atexit.register(flush_session_writes)
+
+    # One thread per request (daemon threads), so a slow breakdown or Atlas call
+    # doesn't hold up every other client
+    with http.server.ThreadingHTTPServer(("0.0.0.0", PORT), TodoHandler) as httpd:
         print(f"✨ To-Do App running at http://localhost:{PORT}")
         print(f"📊 Database: MongoDB Atlas - {DB_NAME}")
         print(f"🔐 Authentication: Enabled")
@@ -1783,4 +2650,8 @@ if __name__ == '__main__':
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\n\n👋 Shutting down server...")
-            client.close()
+            # Record transfers and sessions that were accepted but not yet written
+            drain_credit_queue()
+            flush_session_writes()
+            if mongo_connected:
+                client.close()
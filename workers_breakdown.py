@@ -1,6 +1,8 @@
 import time
 import uuid
-from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 from db import tasks_col, profiles_col
 from gemini_client import call_gemini
@@ -8,16 +10,24 @@ from parsers import parse_json_array, parse_json_object
 from prompts import PROMPT_BREAKDOWN, PROMPT_TASK_TYPE
 from pace import get_pace_multiplier, clamp
 from config import (
-    CHUNK_SECONDS, MAX_SUBTASKS,
+    CHUNK_SECONDS, MAX_SUBTASKS, BREAKDOWN_WORKERS,
     KEY_USER_ID, KEY_TASK, KEY_DONE, KEY_EXPECTED, KEY_SUBTASKS,
     KEY_NEEDS_BREAKDOWN, KEY_ARCHIVED, KEY_CREATED, KEY_TASK_TYPE
 )
 
 ALLOWED_TYPES = {"homework", "reading", "lab_report", "exam_prep", "project", "other"}
 
+# paced subtasks are clamped between 5 and 45 minutes
+MIN_SUBTASK_S, MAX_SUBTASK_S = 300, 2700
+
+# breakdown_one_task only reads the title and cached type
+BREAKDOWN_PROJECTION = {KEY_TASK: 1, KEY_TASK_TYPE: 1}
+
 def now_iso() -> str:
     return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
 
+# temperature 0 makes the answer stable per title, so skip repeat Gemini calls
+@lru_cache(maxsize=1024)
 def infer_task_type(task_title: str) -> str:
     text = call_gemini(PROMPT_TASK_TYPE.format(task_title=task_title), temperature=0.0)
     obj = parse_json_object(text)
@@ -32,23 +42,14 @@ def ensure_profile(user_id: str) -> Dict[str, Any]:
         pcol.insert_one(prof)
     return prof
 
-def apply_pace(subtasks: List[Dict[str, Any]], pace: float) -> List[Dict[str, Any]]:
-    # clamp each subtask between 5 and 45 minutes
-    MIN_S, MAX_S = 300, 2700
-    out = []
-    for st in subtasks:
-        s = dict(st)
-        s["expectedTime"] = int(clamp(int(s["expectedTime"]) * pace, MIN_S, MAX_S))
-        out.append(s)
-    return out
-
-def breakdown_one_task(user_id: str, doc: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str, float]:
+def breakdown_one_task(user_id: str, doc: Dict[str, Any], prof: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], str, float]:
     title = (doc.get(KEY_TASK) or "").strip()
     if not title:
         raise ValueError("Missing task title")
 
     # per-user pace
-    prof = ensure_profile(user_id)
+    if prof is None:
+        prof = ensure_profile(user_id)
     task_type = doc.get(KEY_TASK_TYPE) or infer_task_type(title)
     pace = get_pace_multiplier(prof, task_type)
 
@@ -62,6 +63,7 @@ def breakdown_one_task(user_id: str, doc: Dict[str, Any]) -> Tuple[List[Dict[str
     text = call_gemini(prompt, temperature=0.2)
     raw = parse_json_array(text)
 
+    # validate, normalize and apply pace in a single pass
     cleaned: List[Dict[str, Any]] = []
     for i, st in enumerate(raw[:MAX_SUBTASKS], start=1):
         for k in ("task", "expectedTime", "actualTime", "done"):
@@ -71,12 +73,11 @@ def breakdown_one_task(user_id: str, doc: Dict[str, Any]) -> Tuple[List[Dict[str
         cleaned.append({
             "id": f"st_{i}_{uuid.uuid4().hex[:6]}",
             "task": str(st["task"]).strip(),
-            "expectedTime": int(st["expectedTime"]),
+            "expectedTime": int(clamp(int(st["expectedTime"]) * pace, MIN_SUBTASK_S, MAX_SUBTASK_S)),
             "actualTime": int(st["actualTime"]),
             "done": bool(st["done"]),
         })
 
-    cleaned = apply_pace(cleaned, pace)
     return cleaned, task_type, pace
 
 def run_breakdown_for_user(user_id: str, limit: int = 10) -> int:
@@ -89,12 +90,16 @@ def run_breakdown_for_user(user_id: str, limit: int = 10) -> int:
         KEY_DONE: False,   # don't breakdown completed tasks
     }
 
-    cursor = tcol.find(query).sort(KEY_CREATED, 1).limit(limit)
+    cursor = tcol.find(query, BREAKDOWN_PROJECTION).sort(KEY_CREATED, 1).limit(limit)
 
     processed = 0
+    prof = None
     for doc in cursor:
         try:
-            subtasks, task_type, pace = breakdown_one_task(user_id, doc)
+            # one profile read per user, not per task
+            if prof is None:
+                prof = ensure_profile(user_id)
+            subtasks, task_type, pace = breakdown_one_task(user_id, doc, prof)
             expected_new = sum(st["expectedTime"] for st in subtasks)
 
             tcol.update_one(
@@ -128,7 +133,10 @@ def run_breakdown_for_all_users(limit_per_user: int = 10) -> Dict[str, int]:
     user_ids = tcol.distinct(KEY_USER_ID, {KEY_ARCHIVED: False})
     user_ids = [str(u) for u in user_ids if u is not None and str(u).strip() != ""]
 
-    results: Dict[str, int] = {}
-    for uid in user_ids:
-        results[uid] = run_breakdown_for_user(uid, limit=limit_per_user)
-    return results
\ No newline at end of file
+    if not user_ids:
+        return {}
+
+    # users are independent and each one waits on Gemini, so overlap them
+    with ThreadPoolExecutor(max_workers=min(BREAKDOWN_WORKERS, len(user_ids))) as pool:
+        counts = pool.map(lambda uid: run_breakdown_for_user(uid, limit=limit_per_user), user_ids)
+        return dict(zip(user_ids, counts))
\ No newline at end of file